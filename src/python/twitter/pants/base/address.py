@@ -39,6 +39,9 @@ class Address(object):
   Where ``path/to/buildfile:targetname`` is the dependent target address.
   """
 
+  # Addresses are used as keys in large target maps, so we avoid a per-instance __dict__.
+  __slots__ = ('buildfile', 'target_name', '_hash')
+
   @classmethod
   def parse(cls, root_dir, spec, is_relative=True):
     """Parses the given spec into an Address.
@@ -77,6 +80,8 @@ class Address(object):
     assert isinstance(target_name, Compatibility.string)
     self.buildfile = buildfile
     self.target_name = target_name
+    # Addresses are immutable, so we compute the hash once up front.
+    self._hash = self._compute_hash()
 
   def reference(self, referencing_buildfile_path=None):
     """How to reference this address in a BUILD file."""
@@ -96,6 +101,19 @@ class Address(object):
     return result
 
   def __hash__(self):
+    return self._hash
+
+  # Classes with __slots__ can only be pickled with the default protocol if they provide their
+  # state explicitly.
+  def __getstate__(self):
+    return self.buildfile, self.target_name
+
+  def __setstate__(self, state):
+    self.buildfile, self.target_name = state
+    # We recompute the hash rather than pickling it, as string hashes may differ across processes.
+    self._hash = self._compute_hash()
+
+  def _compute_hash(self):
     value = 17
     value *= 37 + hash(self.buildfile.canonical_relpath)
     value *= 37 + hash(self.target_name)
@@ -1,6 +1,7 @@
+import functools
 import os
 import pkgutil
-import urlparse
+import urllib
 
 import pystache
 
@@ -41,21 +42,63 @@ class MustacheRenderer(object):
     self._template_dir = template_dir
     self._package_name = package_name
     self._pystache_renderer = pystache.Renderer(search_dirs=template_dir)
+    self._parsed_templates = {}  # Template name -> (version, pystache ParsedTemplate).
+    self._parsed_template_strings = {}  # Template string -> pystache ParsedTemplate.
 
   def render_name(self, template_name, args):
-    # TODO: Precompile and cache the templates?
+    return self.render(self._get_parsed_template(template_name), args)
+
+  def template_version(self, template_name):
+    """Returns a value that changes whenever the named template does.
+
+    Templates in a template_dir may be edited while we're running (that's the point of a
+    template_dir), so this is the mtime of the template's file. The templates embedded in our
+    package can't change, so for those this is always None.
+    """
+    if self._template_dir:
+      return os.path.getmtime(self._template_path(template_name))
+    return None
+
+  def _template_path(self, template_name):
+    return os.path.join(self._template_dir, template_name + '.mustache')
+
+  def _get_parsed_template(self, template_name):
+    # Templates are rendered at least once per workunit, so we parse each one just once, and only
+    # reparse it if it changes.
+    version = self.template_version(template_name)
+    cached = self._parsed_templates.get(template_name)
+    if cached is not None and cached[0] == version:
+      return cached[1]
     if self._template_dir:
-      # Let pystache find the template by name.
-      return self._pystache_renderer.render_name(template_name, MustacheRenderer.expand(args))
+      with open(self._template_path(template_name), 'r') as infile:
+        template = infile.read()
     else:
-      # Load the named template embedded in our package.
       template = pkgutil.get_data(self._package_name,
                                   os.path.join('templates', template_name + '.mustache'))
-      return self.render(template, args)
+    parsed_template = pystache.parse(self._pystache_renderer.unicode(template))
+    self._parsed_templates[template_name] = (version, parsed_template)
+    return parsed_template
 
   def render(self, template, args):
+    if isinstance(template, basestring):
+      template = self._get_parsed_template_string(template)
     return self._pystache_renderer.render(template, MustacheRenderer.expand(args))
 
+  # The template strings we're asked to render are callable arg strings and the like, taken from
+  # our own templates, so there are only a handful of distinct ones. The cap is just a safeguard.
+  _MAX_PARSED_TEMPLATE_STRINGS = 1024
+
+  def _get_parsed_template_string(self, template):
+    # Each of these is rendered over and over (e.g., once per workunit), so we parse it just once.
+    parsed_template = self._parsed_template_strings.get(template)
+    if parsed_template is None:
+      if len(self._parsed_template_strings) >= MustacheRenderer._MAX_PARSED_TEMPLATE_STRINGS:
+        self._parsed_template_strings.clear()
+      parsed_template = pystache.parse(template if isinstance(template, unicode) else
+                                       self._pystache_renderer.unicode(template))
+      self._parsed_template_strings[template] = parsed_template
+    return parsed_template
+
   def render_callable(self, inner_template_name, arg_string, outer_args):
     """Handle a mustache callable.
 
@@ -70,16 +113,32 @@ class MustacheRenderer(object):
     #. Returns the resulting text.
 
     Use by adding
-    ``{ 'foo': lambda x: self._renderer.render_callable('foo_template', x, args) }``
+    ``{ 'foo': self._renderer.make_callable('foo_template', args) }``
     to the args of the outer template, which can then contain ``{{#foo}}arg_string{{/foo}}``.
     """
     # First render the arg_string (mustache doesn't do this for you, and it may itself
     # contain mustache constructs).
     rendered_arg_string = self.render(arg_string, outer_args)
-    # Parse the inner args as CGI args.
-    inner_args = dict([(k, v[0]) for k, v in urlparse.parse_qs(rendered_arg_string).items()])
     # Order matters: lets the inner args override the outer args.
-    args = dict(outer_args.items() + inner_args.items())
+    args = dict(outer_args)
+    args.update(MustacheRenderer._parse_callable_args(rendered_arg_string))
     # Render.
     return self.render_name(inner_template_name, args)
 
+  @staticmethod
+  def _parse_callable_args(arg_string):
+    # Parses CGI args, keeping the first value of a repeated key. Cheaper than urlparse.parse_qs,
+    # which matters as this is called for every callable in every template we render, and we
+    # don't need its generality: the arg strings are short, flat and come from our own templates.
+    # Note that unlike parse_qs we only separate args with '&', not ';', so values may contain ';'.
+    ret = {}
+    for pair in arg_string.split('&'):
+      key, sep, val = pair.partition('=')
+      if sep and val:
+        ret.setdefault(urllib.unquote_plus(key), urllib.unquote_plus(val))
+    return ret
+
+  def make_callable(self, inner_template_name, outer_args):
+    """Returns a mustache callable that delegates to render_callable(). See there for details."""
+    return functools.partial(self.render_callable, inner_template_name, outer_args=outer_args)
+
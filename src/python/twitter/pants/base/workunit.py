@@ -88,6 +88,9 @@ class WorkUnit(object):
     # E.g., a tool invocation may have 'stdout', 'stderr', 'debug_log' etc.
     self._outputs = {}  # name -> output buffer.
 
+    self._ancestors = None  # Computed lazily.
+    self._start_dict = None  # The parts of to_dict() that don't change after start(). Lazy.
+
     # Do this last, as the parent's _self_time() might get called before we're
     # done initializing ourselves.
     # TODO: Ensure that a parent can't be ended before all its children are.
@@ -100,6 +103,7 @@ class WorkUnit(object):
   def start(self):
     """Mark the time at which this workunit started."""
     self.start_time = time.time()
+    self._start_dict = None
 
   def end(self):
     """Mark the time at which this workunit ended."""
@@ -168,17 +172,24 @@ class WorkUnit(object):
     return ret
 
   def ancestors(self):
-    """Returns a list consisting of this workunit and those enclosing it, up to the root."""
-    ret = []
-    workunit = self
-    while workunit is not None:
-      ret.append(workunit)
-      workunit = workunit.parent
-    return ret
+    """Returns a list consisting of this workunit and those enclosing it, up to the root.
+
+    The list is shared between calls and must not be modified.
+    """
+    # Reporters ask for this on every chunk of output, and a workunit's parent never changes.
+    if self._ancestors is None:
+      self._ancestors = [self] + (self.parent.ancestors() if self.parent else [])
+    return self._ancestors
 
   def path(self):
     """Returns a path string for this workunit, E.g., 'all:compile:jvm:scalac'."""
-    return ':'.join(reversed([w.name for w in self.ancestors()]))
+    names = []
+    workunit = self
+    while workunit is not None:
+      names.append(workunit.name)
+      workunit = workunit.parent
+    names.reverse()
+    return ':'.join(names)
 
   def unaccounted_time(self):
     """Returns non-leaf time spent in this workunit.
@@ -190,11 +201,20 @@ class WorkUnit(object):
 
   def to_dict(self):
     """Useful for providing arguments to templates."""
-    ret = {}
-    for key in ['name', 'cmd', 'id', 'start_time', 'end_time',
-                'outcome', 'start_time_string', 'start_delta_string']:
-      val = getattr(self, key)
-      ret[key] = val() if hasattr(val, '__call__') else val
+    # Reporters call this for every workunit and, via the parent, for all its ancestors. So we
+    # format the start time etc. only once, and just fill in the fields that can still change.
+    if self._start_dict is None:
+      self._start_dict = {
+        'name': self.name,
+        'cmd': self.cmd,
+        'id': self.id,
+        'start_time': self.start_time,
+        'start_time_string': self.start_time_string(),
+        'start_delta_string': self.start_delta_string()
+      }
+    ret = dict(self._start_dict)
+    ret['end_time'] = self.end_time
+    ret['outcome'] = self.outcome()
     ret['parent'] = self.parent.to_dict() if self.parent else None
     return ret
 
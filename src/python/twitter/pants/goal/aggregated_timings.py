@@ -1,10 +1,14 @@
 import os
+import threading
 
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 from twitter.common.dirutil import safe_mkdir_for
 
 
+# The aggregated timing for a single label.
+Timing = namedtuple('Timing', ['label', 'timing', 'is_tool'])
+
 class AggregatedTimings(object):
   """Aggregates timings over multiple invocations of 'similar' work.
 
@@ -13,6 +17,10 @@ class AggregatedTimings(object):
     # Map path -> timing in seconds (a float)
     self._timings_by_path = defaultdict(float)
     self._tool_labels = set()
+    # An immutable snapshot of the timings, or None if a timing was added since we last took one.
+    self._snapshot = None
+    # Timings may be added from one thread while a reporter reads them from another.
+    self._lock = threading.Lock()
     self._path = path
     safe_mkdir_for(self._path)
 
@@ -22,19 +30,32 @@ class AggregatedTimings(object):
     secs - a double, so fractional seconds are allowed.
     is_tool - whether this label represents a tool invocation.
     """
-    self._timings_by_path[label] += secs
-    if is_tool:
-      self._tool_labels.add(label)
+    with self._lock:
+      self._timings_by_path[label] += secs
+      if is_tool:
+        self._tool_labels.add(label)
+      self._snapshot = None
     # Check existence in case we're a clean-all. We don't want to write anything in that case.
     if self._path and os.path.exists(os.path.dirname(self._path)):
       with open(self._path, 'w') as f:
-        for x in self.get_all():
-          f.write('%(label)s: %(timing)s\n' % x)
+        f.write(''.join(['%s: %s\n' % (x.label, x.timing) for x in self.snapshot()]))
+
+  def snapshot(self):
+    """Returns all the timings as a tuple of Timing records, sorted in decreasing order.
+
+    The snapshot is immutable and is shared by all callers until a timing is next added, so
+    multiple reporters can read it, possibly from different threads, without copying it.
+    """
+    with self._lock:
+      if self._snapshot is None:
+        self._snapshot = tuple(
+          Timing(label, timing, label in self._tool_labels) for label, timing in
+          sorted(self._timings_by_path.items(), key=lambda x: x[1], reverse=True))
+      return self._snapshot
 
   def get_all(self):
     """Returns all the timings, sorted in decreasing order.
 
-    Each value is a dict: { path: <path>, timing: <timing in seconds> }
+    Each value is a dict: { label: <path>, timing: <timing in seconds>, is_tool: <bool> }
     """
-    return [{ 'label': x[0], 'timing': x[1], 'is_tool': x[0] in self._tool_labels}
-            for x in sorted(self._timings_by_path.items(), key=lambda x: x[1], reverse=True)]
+    return [{ 'label': x.label, 'timing': x.timing, 'is_tool': x.is_tool } for x in self.snapshot()]
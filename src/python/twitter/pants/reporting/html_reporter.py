@@ -1,7 +1,7 @@
-import cgi
+import errno
+import itertools
 import os
-import re
-import uuid
+import time
 
 from collections import namedtuple, defaultdict
 from pystache.renderer import Renderer
@@ -10,12 +10,16 @@ from twitter.common.dirutil import safe_mkdir
 from twitter.pants.base.build_environment import get_buildroot
 from twitter.pants.base.mustache import MustacheRenderer
 from twitter.pants.base.workunit import WorkUnit
+from twitter.pants.reporting.htmlify import htmlify_text
 from twitter.pants.reporting.linkify import linkify
 from twitter.pants.reporting.report import Report
 from twitter.pants.reporting.reporter import Reporter
 from twitter.pants.reporting.reporting_utils import items_to_report_element
 
 
+def _value_or_default(value, default):
+  return value or default
+
 class HtmlReporter(Reporter):
   """HTML reporting to files.
 
@@ -44,7 +48,25 @@ class HtmlReporter(Reporter):
     self._report_file = None
 
     # We redirect stdout, stderr etc. of tool invocations to these files.
-    self._output_files = defaultdict(dict)  # workunit_id -> {path -> fileobj}.
+    self._output_files = defaultdict(dict)  # workunit_id -> {label -> fileobj}.
+
+    # Generates ids for content and details. The uuids we used to use were unique across runs, so
+    # we keep that property with a random per-report prefix, but we only pay for it once.
+    self._id_prefix = os.urandom(4).encode('hex')
+    self._id_counter = itertools.count()
+
+    # The result of our last check for the html dir, and when we made it.
+    self._html_dir_existed = False
+    self._html_dir_checked_at = 0
+
+    # (template version, format string), lazily created from the append_to_workunit template.
+    # See _get_append_to_workunit_format().
+    self._append_to_workunit_format = None
+
+    # Whether the timings and cache stats have changed since we last rendered them, and when we did.
+    self._summaries_stale = False
+    self._summaries_rendered_at = 0
+    self._summary_versions = {}  # filename -> version of the content we last rendered into it.
 
   def report_path(self):
     """The path to the main report file."""
@@ -57,6 +79,8 @@ class HtmlReporter(Reporter):
 
   def close(self):
     """Implementation of Reporter callback."""
+    if self._summaries_stale:
+      self._update_summaries()
     self._report_file.close()
     # Make sure everything's closed.
     for files in self._output_files.values():
@@ -84,7 +108,7 @@ class HtmlReporter(Reporter):
              'initially_open': is_test or not (is_bootstrap or is_tool or is_multitool),
              'is_tool': is_tool,
              'is_multitool': is_multitool }
-    args.update({ 'collapsible': lambda x: self._renderer.render_callable('collapsible', x, args) })
+    args['collapsible'] = self._renderer.make_callable('collapsible', args)
 
     # Render the workunit's div.
     s = self._renderer.render_name('workunit_start', args)
@@ -103,7 +127,8 @@ class HtmlReporter(Reporter):
     self._emit(s)
 
   # CSS classes from pants.css that we use to style the header text to reflect the outcome.
-  _outcome_css_classes = ['aborted', 'failure', 'warning', 'success', 'unknown']
+  # Indexed by outcome (WorkUnit.ABORTED etc.)
+  _outcome_css_classes = ('aborted', 'failure', 'warning', 'success', 'unknown')
 
   def end_workunit(self, workunit):
     """Implementation of Reporter callback."""
@@ -117,7 +142,7 @@ class HtmlReporter(Reporter):
       if unaccounted_time_secs >= 1 and unaccounted_time_secs > 0.05 * duration:
         unaccounted_time = '%.3f' % unaccounted_time_secs
     args = { 'workunit': workunit.to_dict(),
-             'status': workunit.choose(*HtmlReporter._outcome_css_classes),
+             'status': HtmlReporter._outcome_css_classes[workunit.outcome()],
              'timing': timing,
              'unaccounted_time': unaccounted_time,
              'aborted': workunit.outcome() == WorkUnit.ABORTED }
@@ -128,18 +153,57 @@ class HtmlReporter(Reporter):
     s += self._renderer.render_name('workunit_end', args)
     self._emit(s)
 
+    # Re-rendering the timings and cache stats is proportional to the number of labels and
+    # targets seen so far, so we don't do it for every workunit. We just note that they're out of
+    # date, and flush() brings them up to date, at most once per _SUMMARY_REFRESH_INTERVAL_SECS.
+    self._summaries_stale = True
+
+    for f in self._output_files.pop(workunit.id, {}).values():
+      f.close()
+
+  # Report flushes us on every emitter tick, but also on every workunit end, so we can't rely on
+  # the flush rate to limit how often we re-render the summaries.
+  _SUMMARY_REFRESH_INTERVAL_SECS = 0.5
+
+  def flush(self):
+    """Implementation of Reporter callback."""
+    # Note that Report serializes all callbacks, so this can't race with a write.
+    if self._summaries_stale and \
+        time.time() - self._summaries_rendered_at >= HtmlReporter._SUMMARY_REFRESH_INTERVAL_SECS:
+      self._update_summaries()
+    if self._report_file:
+      self._report_file.flush()
+    for files in self._output_files.values():
+      for f in files.values():
+        f.flush()
+
+  def _update_summaries(self):
+    """Re-render the aggregated timings and artifact cache stats."""
+    self._summaries_stale = False
+    self._summaries_rendered_at = time.time()
+
+    # Each of these renders everything seen so far, so we skip those that haven't changed since we
+    # last rendered them. The timings change with almost every workunit, but the cache stats often
+    # don't. A timings snapshot is an immutable tuple, so we can compare it to the last one
+    # directly. For the cache stats, the number of hits and misses per cache tells us.
+    def update(filename, version, render):
+      if version != self._summary_versions.get(filename):
+        self._summary_versions[filename] = version
+        self._overwrite(filename, render())
+
     # Update the timings.
-    def render_timings(timings):
-      timings_dict = timings.get_all()
-      for item in timings_dict:
-        item['timing_string'] = '%.3f' % item['timing']
+    def render_timings(snapshot):
+      # The snapshot is shared with other reporters, so we build our own template args from it.
       args = {
-        'timings': timings_dict
+        'timings': [{ 'label': x.label, 'timing_string': '%.3f' % x.timing, 'is_tool': x.is_tool }
+                    for x in snapshot]
       }
       return self._renderer.render_name('aggregated_timings', args)
 
-    self._overwrite('cumulative_timings', render_timings(self.run_tracker.cumulative_timings))
-    self._overwrite('self_timings', render_timings(self.run_tracker.self_timings))
+    for filename, timings in [('cumulative_timings', self.run_tracker.cumulative_timings),
+                              ('self_timings', self.run_tracker.self_timings)]:
+      snapshot = timings.snapshot()
+      update(filename, snapshot, lambda: render_timings(snapshot))
 
     # Update the artifact cache stats.
     def render_cache_stats(artifact_cache_stats):
@@ -160,49 +224,70 @@ class HtmlReporter(Reporter):
         msg_elements = ['No artifact cache use.']
       return self._render_message(*msg_elements)
 
-    self._overwrite('artifact_cache_stats',
-                    render_cache_stats(self.run_tracker.artifact_cache_stats))
-
-    for f in self._output_files[workunit.id].values():
-      f.close()
+    artifact_cache_stats = self.run_tracker.artifact_cache_stats
+    update('artifact_cache_stats',
+           sorted((cache_name, len(stat.hit_targets), len(stat.miss_targets))
+                  for cache_name, stat in artifact_cache_stats.stats_per_cache.items()),
+           lambda: render_cache_stats(artifact_cache_stats))
 
   def handle_output(self, workunit, label, s):
     """Implementation of Reporter callback."""
-    if os.path.exists(self._html_dir):  # Make sure we're not immediately after a clean-all.
-      path = os.path.join(self._html_dir, '%s.%s' % (workunit.id, label))
+    # Note that s is all the output gathered since the last flush, so we htmlify and write it in
+    # one go, rather than line by line.
+    if self._html_dir_exists():  # Make sure we're not immediately after a clean-all.
       output_files = self._output_files[workunit.id]
-      if path not in output_files:
-        f = open(path, 'w')
-        output_files[path] = f
-      else:
-        f = output_files[path]
+      f = output_files.get(label)
+      if f is None:
+        f = self._open_in_html_dir('%s.%s' % (workunit.id, label))
+        if f is None:
+          return
+        output_files[label] = f
       f.write(self._htmlify_text(s))
-      # We must flush in the same thread as the write.
-      f.flush()
-
-  _log_level_css_map = {
-    Report.FATAL: 'fatal',
-    Report.ERROR: 'error',
-    Report.WARN:  'warn',
-    Report.INFO:  'info',
-    Report.DEBUG: 'debug'
-  }
+
+  # The opening tag for each log level's content, styled by a CSS class from pants.css.
+  _log_level_span_map = dict((level, '<span class="%s">' % css_class) for level, css_class in [
+    (Report.FATAL, 'fatal'),
+    (Report.ERROR, 'error'),
+    (Report.WARN,  'warn'),
+    (Report.INFO,  'info'),
+    (Report.DEBUG, 'debug')
+  ])
   def do_handle_log(self, workunit, level, *msg_elements):
     """Implementation of Reporter callback."""
-    content = '<span class="%s">%s</span>' % \
-              (HtmlReporter._log_level_css_map[level], self._render_message(*msg_elements))
+    content = HtmlReporter._log_level_span_map[level] + self._render_message(*msg_elements) + \
+              '</span>'
 
     # Generate some javascript that appends the content to the workunit's div.
     args = {
-      'content_id': uuid.uuid4(),  # Identifies this content.
+      'content_id': self._next_id('content'),  # Identifies this content.
       'workunit_id': workunit.id,  # The workunit this reporting content belongs to.
       'content': content,  # The content to append.
       }
-    s = self._renderer.render_name('append_to_workunit', args)
+    s = self._get_append_to_workunit_format() % args
 
     # Emit that javascript to the main report body.
     self._emit(s)
 
+  def _get_append_to_workunit_format(self):
+    # We append to a workunit for every log message, and rendering even this small template costs
+    # far more than the message itself. Its args are flat, so we render it just once, with
+    # placeholders for the args, and turn that into a format string for them. If the template is
+    # from a template_dir it may be edited while we're running, so we rebuild the format string
+    # whenever the template changes.
+    version = self._renderer.template_version('append_to_workunit')
+    if self._append_to_workunit_format is None or self._append_to_workunit_format[0] != version:
+      keys = ('content_id', 'workunit_id', 'content')
+      placeholder = lambda key: '\0%s\0' % key
+      fmt = self._renderer.render_name('append_to_workunit',
+                                       dict((key, placeholder(key)) for key in keys))
+      fmt = fmt.replace('%', '%%')
+      for key in keys:
+        fmt = fmt.replace(placeholder(key), '%%(%s)s' % key)
+      self._append_to_workunit_format = (version, fmt)
+    return self._append_to_workunit_format[1]
+
+  _message_element_defaults = ('', None, None, False)
+
   def _render_message(self, *msg_elements):
     elements = []
     detail_ids = []
@@ -223,48 +308,68 @@ class HtmlReporter(Reporter):
       # if "hits" are open and "misses" are closed, we want to remember that even after
       # the cache stats are updated and the message re-rendered.
       if isinstance(element, basestring):
-        element = [element]
-      defaults = ('', None, None, False)
+        # By far the most common case, so we don't bother with defaults etc.
+        elements.append({ 'text': self._htmlify_text(element) })
+        continue
       # Map assumes None for missing values, so this will pick the default for those.
       (text, detail, detail_id, detail_initially_visible) = \
-        map(lambda x, y: x or y, element, defaults)
-      element_args = {'text': self._htmlify_text(text) }
+        map(_value_or_default, element, HtmlReporter._message_element_defaults)
+      element_args = { 'text': self._htmlify_text(text) }
       if detail is not None:
-        detail_id = detail_id or uuid.uuid4()
+        detail_id = detail_id or self._next_id('detail')
         detail_ids.append(detail_id)
-        element_args.update({
-          'detail': self._htmlify_text(detail),
-          'detail_initially_visible': detail_initially_visible,
-          'detail-id': detail_id
-        })
+        element_args['detail'] = self._htmlify_text(detail)
+        element_args['detail_initially_visible'] = detail_initially_visible
+        element_args['detail-id'] = detail_id
       elements.append(element_args)
     args = { 'elements': elements,
              'all-detail-ids': detail_ids }
     return self._renderer.render_name('message', args)
 
+  def _next_id(self, prefix):
+    return '%s-%s-%x' % (prefix, self._id_prefix, next(self._id_counter))
+
+  # How long we trust a check that the html dir exists.
+  _HTML_DIR_CHECK_INTERVAL_SECS = 1.0
+
+  def _html_dir_exists(self):
+    # We write to files we already have open on every log message and chunk of tool output, and
+    # only need to notice a clean-all promptly, not instantly: writes to an open file succeed even
+    # after its dir is deleted. So we stat the dir at most once per interval. Opening a new file
+    # can't rely on this, see _open_in_html_dir().
+    now = time.time()
+    if now - self._html_dir_checked_at >= HtmlReporter._HTML_DIR_CHECK_INTERVAL_SECS:
+      self._html_dir_existed = os.path.exists(self._html_dir)
+      self._html_dir_checked_at = now
+    return self._html_dir_existed
+
   def _emit(self, s):
     """Append content to the main report file."""
-    if os.path.exists(self._html_dir):  # Make sure we're not immediately after a clean-all.
+    if self._html_dir_exists():  # Make sure we're not immediately after a clean-all.
       self._report_file.write(s)
-      self._report_file.flush()  # We must flush in the same thread as the write.
 
   def _overwrite(self, filename, s):
     """Overwrite a file with the specified contents."""
-    if os.path.exists(self._html_dir):  # Make sure we're not immediately after a clean-all.
-      with open(os.path.join(self._html_dir, filename), 'w') as f:
+    f = self._open_in_html_dir(filename)
+    if f is not None:
+      with f:
         f.write(s)
 
+  def _open_in_html_dir(self, filename):
+    """Open a file in the html dir for writing, or return None if the dir is gone.
+
+    The dir may have been deleted by a clean-all at any time, including since we last checked.
+    """
+    try:
+      return open(os.path.join(self._html_dir, filename), 'w')
+    except (IOError, OSError) as e:
+      if e.errno != errno.ENOENT:
+        raise
+      # Let the writes to our open files know too.
+      self._html_dir_existed = False
+      self._html_dir_checked_at = time.time()
+      return None
+
   def _htmlify_text(self, s):
     """Make text HTML-friendly."""
-    colored = self._handle_ansi_color_codes(cgi.escape(str(s)))
-    return linkify(self._buildroot, colored).replace('\n', '</br>')
-
-  _ANSI_COLOR_CODE_RE = re.compile(r'\033\[((\d|;)*)m')
-  def _handle_ansi_color_codes(self, s):
-    """Replace ansi color sequences with spans of appropriately named css classes."""
-    def ansi_code_to_css(code):
-      return ' '.join(['ansi-%s' % c for c in code.split(';')])
-    return '<span>' +\
-           HtmlReporter._ANSI_COLOR_CODE_RE.sub(
-             lambda m: '</span><span class="%s">' % ansi_code_to_css(m.group(1)), s) +\
-           '</span>'
+    return htmlify_text(self._buildroot, s)
@@ -0,0 +1,77 @@
+try:
+  import re2 as re
+except ImportError:
+  import re
+
+from twitter.pants.reporting.linkify import PATH_PATTERN, linkify_path
+
+
+_ANSI_COLOR_CODE = r'\033\[([\d;]*)m'
+
+# There are only a handful of distinct color codes, and each is used over and over, so we memoize
+# the span for each in a plain dict: this is the innermost loop of htmlifying colored tool output,
+# and a dict lookup is much cheaper than going through an lru_cache. The cap is just a safeguard
+# against garbage input.
+_ansi_spans = {}
+_MAX_ANSI_SPANS = 256
+
+def _ansi_code_to_span(code):
+  span = _ansi_spans.get(code)
+  if span is None:
+    span = '</span><span class="ansi-%s">' % code.replace(';', ' ansi-')
+    if len(_ansi_spans) < _MAX_ANSI_SPANS:
+      _ansi_spans[code] = span
+  return span
+
+# We style ansi color codes and linkify paths in a single scan, rather than one scan for each.
+# A match that starts with an escape char is an ansi sequence, and group 1 is its color code.
+# Otherwise a path matched. We don't test group 1 for None: some re2 bindings return '' for an
+# unmatched group.
+_ANSI_COLOR_CODE_OR_PATH_RE = re.compile('%s|%s' % (_ANSI_COLOR_CODE, PATH_PATTERN))
+
+# Log messages and tool output are highly repetitive (the same warnings, the same paths), so we
+# memoize the HTML for short strings. Long chunks rarely repeat and would just bloat the cache.
+# We don't memoize the HTML for a string with a path that doesn't link anywhere: the path is often
+# logged before the tool that creates it has run, and must get its link once it exists. As in
+# linkify, this is called for every log message and chunk of output, so we use a plain dict rather
+# than an lru_cache, and simply stop adding to it once it's full.
+_htmlified_texts = {}  # (buildroot, text) -> html.
+_MAX_HTMLIFIED_TEXTS = 4096
+_MAX_CACHED_TEXT_LEN = 1024
+
+def htmlify_text(buildroot, s):
+  """Make text HTML-friendly: escape it, style ansi color codes and linkify paths and URLs."""
+  s = str(s)
+  if len(s) > _MAX_CACHED_TEXT_LEN:
+    return _htmlify_text(buildroot, s)[0]
+  key = (buildroot, s)
+  html = _htmlified_texts.get(key)
+  if html is None:
+    html, all_paths_linked = _htmlify_text(buildroot, s)
+    if all_paths_linked and len(_htmlified_texts) < _MAX_HTMLIFIED_TEXTS:
+      _htmlified_texts[key] = html
+  return html
+
+def _htmlify_text(buildroot, s):
+  """Returns a pair (html, whether every path in s linked somewhere)."""
+  unlinked_paths = []
+  def replace(m):
+    match = m.group(0)
+    if match.startswith('\033'):
+      return _ansi_code_to_span(m.group(1))
+    link = linkify_path(buildroot, match)
+    if link == match:
+      unlinked_paths.append(match)
+    return link
+  # Most messages have neither color codes nor paths (which contain at least one slash), and a
+  # substring test is much cheaper than a regex scan. Note that we must test before escaping, as
+  # the breaks we turn newlines into contain a slash.
+  if '\033' in s or '/' in s:
+    html = '<span>' + _ANSI_COLOR_CODE_OR_PATH_RE.sub(replace, _escape_html(s)) + '</span>'
+    return html, not unlinked_paths
+  return '<span>' + _escape_html(s) + '</span>', True
+
+def _escape_html(s):
+  # We turn newlines into breaks here rather than after linkifying, as the breaks can't be mistaken
+  # for paths. Note that str.translate() can only map single bytes, so we chain replaces instead.
+  return s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\n', '</br>')
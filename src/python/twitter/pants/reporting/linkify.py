@@ -1,49 +1,104 @@
 import os
-import re
+import stat
+
+try:
+  # RE2 scans in linear time, which matters as we run these regexes over all tool output.
+  import re2 as re
+except ImportError:
+  import re
 
 from twitter.pants.base.build_file import BuildFile
 
 
 # A regex to recognize substrings that are probably URLs or file paths. Broken down for readability.
 _PREFIX = r'(https?://)?/?' # http://, https:// or / or nothing.
-_OPTIONAL_PORT = r'(:\d+)?'
-_REL_PATH_COMPONENT = r'(\w|[-.])+'  # One or more alphanumeric, underscore, dash or dot.
+_OPTIONAL_PORT = r'(?::\d+)?'
+# One or more alphanumeric, underscore, dash or dot. A single char class, rather than an alternation
+# under a repeat, so that failed matches don't backtrack through every way of splitting a component.
+_REL_PATH_COMPONENT = r'[\w.-]+'
 _ABS_PATH_COMPONENT = r'/' + _REL_PATH_COMPONENT
-_ABS_PATH_COMPONENTS = r'(%s)+' % _ABS_PATH_COMPONENT
-_OPTIONAL_TARGET_SUFFIX = r'(:%s)?' % _REL_PATH_COMPONENT  # For /foo/bar:target.
+_ABS_PATH_COMPONENTS = r'(?:%s)+' % _ABS_PATH_COMPONENT
+_OPTIONAL_TARGET_SUFFIX = r'(?::%s)?' % _REL_PATH_COMPONENT  # For /foo/bar:target.
 
 # Note that we require at least two path components.
 # We require the last characgter to be alphanumeric or underscore, because some tools print an
 # ellipsis after file names (I'm looking at you, zinc). None of our files end in a dot in practice,
 # so this is fine.
-_PATH = _PREFIX + _REL_PATH_COMPONENT + _OPTIONAL_PORT + _ABS_PATH_COMPONENTS + \
-        _OPTIONAL_TARGET_SUFFIX + '\w'
-_PATH_RE = re.compile(_PATH)
+PATH_PATTERN = _PREFIX + _REL_PATH_COMPONENT + _OPTIONAL_PORT + _ABS_PATH_COMPONENTS + \
+               _OPTIONAL_TARGET_SUFFIX + '\w'
+# Note that we don't compile with re.UNICODE, so \w only matches ASCII word chars, which is both
+# what we want for paths and the cheaper check.
+_PATH_RE = re.compile(PATH_PATTERN)
+
+# We link references to a target to the BUILD file it's in.
+_BUILD_FILE_SUFFIX = os.sep + BuildFile._CANONICAL_NAME
 
 def linkify(buildroot, s):
   """Augment text by heuristically finding URL and file references and turning them into links/"""
-  def to_url(m):
-    if m.group(1):
-      return m.group(0)  # It's an http(s) url.
-    path = m.group(0)
-    if path.startswith('/'):
-      path = os.path.relpath(path, buildroot)
+  if '/' not in s:
+    return s  # Every path we link has at least two components.
+  return _PATH_RE.sub(lambda m: linkify_path(buildroot, m.group(0)), s)
+
+def linkify_path(buildroot, path):
+  """Returns a link to path if it refers to a URL or to a file or target in the buildroot.
+
+  Otherwise returns path unchanged. The path is typically a match of PATH_PATTERN.
+  """
+  key = (buildroot, path)
+  link = _links.get(key)
+  if link is None:
+    url = _to_url(buildroot, path)
+    if not url:
+      return path
+    link = '<a target="_blank" href="%s">%s</a>' % (url, path)
+    if len(_links) < _MAX_LINKS:
+      _links[key] = link
+  return link
+
+# The same paths recur throughout a build's output, and resolving one costs a few stat calls, so
+# we remember the link for each path. We only remember paths that do link somewhere: a path is
+# often logged before the tool that creates it has run, and must get its link once it exists.
+# Files are rarely deleted during a run, and a stale link is harmless. This is called for every
+# match, so we use a plain dict rather than an lru_cache, and simply stop adding to it once it's
+# full.
+_links = {}  # (buildroot, path) -> link html.
+_MAX_LINKS = 8192
+
+def _to_url(buildroot, path):
+  if path.startswith('http://') or path.startswith('https://'):
+    return path  # It's an http(s) url.
+  if path.startswith('/'):
+    buildroot_prefix = buildroot.rstrip('/') + '/'
+    if path.startswith(buildroot_prefix):
+      # The common case, and much cheaper than relpath.
+      path = path[len(buildroot_prefix):]
     else:
-      # See if it's a reference to a target in a BUILD file.
-      # TODO: Deal with sibling BUILD files?
-      parts = path.split(':')
-      if len(parts) == 2:
-        putative_dir = parts[0]
-      else:
-        putative_dir = path
-      if os.path.isdir(os.path.join(buildroot, putative_dir)):
-        path = os.path.join(putative_dir, BuildFile._CANONICAL_NAME)
-    if os.path.exists(os.path.join(buildroot, path)):
-      # The reporting server serves file content at /browse/<path_from_buildroot>.
-      return '/browse/%s' % path
+      path = os.path.relpath(path, buildroot)
+  else:
+    # See if it's a reference to a target in a BUILD file.
+    # TODO: Deal with sibling BUILD files?
+    parts = path.split(':')
+    if len(parts) == 2:
+      putative_dir = parts[0]
     else:
-      return None
+      putative_dir = path
+    mode = _stat_mode(os.path.join(buildroot, putative_dir))
+    if mode is not None and stat.S_ISDIR(mode):
+      path = putative_dir + _BUILD_FILE_SUFFIX
+    elif putative_dir == path:
+      # We've just stat'ed the path itself, so we already know whether it exists.
+      return _to_browse_url(path) if mode is not None else None
+  if os.path.exists(os.path.join(buildroot, path)):
+    return _to_browse_url(path)
+  else:
+    return None
+
+def _to_browse_url(path):
+  # The reporting server serves file content at /browse/<path_from_buildroot>.
+  return '/browse/%s' % path
 
-  def maybe_add_link(url, text):
-    return '<a target="_blank" href="%s">%s</a>' % (url, text) if url else text
-  return _PATH_RE.sub(lambda m: maybe_add_link(to_url(m), m.group(0)), s)
+def _stat_mode(path):
+  try:
+    return os.stat(path).st_mode
+  except OSError:
+    return None
@@ -17,6 +17,8 @@ try:
 except ImportError:
   _colorfunc_map = {}
 
+_identity = lambda x: x
+
 
 class PlainTextReporter(Reporter):
   """Plain-text reporting to stdout.
@@ -71,8 +73,8 @@ class PlainTextReporter(Reporter):
       # For brevity, we represent each consecutive invocation of a multitool with a dot.
       self.emit('.')
     elif not workunit.parent or \
-        all([not x.has_label(WorkUnit.MULTITOOL) and not x.has_label(WorkUnit.BOOTSTRAP)
-             for x in workunit.parent.ancestors()]):
+        not any(x.has_label(WorkUnit.MULTITOOL) or x.has_label(WorkUnit.BOOTSTRAP)
+                for x in workunit.parent.ancestors()):
       # Bootstrapping can be chatty, so don't show anything for its sub-workunits.
       self.emit('\n%s %s %s[%s]' %
                        (workunit.start_time_string(),
@@ -106,7 +108,7 @@ class PlainTextReporter(Reporter):
     elements = [e if isinstance(e, basestring) else e[0] for e in msg_elements]
     msg = '\n' + ''.join(elements)
     if self.settings.color:
-      msg = _colorfunc_map.get(level, lambda x: x)(msg)
+      msg = _colorfunc_map.get(level, _identity)(msg)
     self.emit(self._prefix(workunit, msg))
     self.flush()
 
@@ -119,7 +121,7 @@ class PlainTextReporter(Reporter):
       self.emit(self._prefix(workunit, s))
     elif self._show_output_unindented(workunit):
       self.emit(s)
-    self.flush()
+    # No need to flush: Report flushes us once it's handed out all the output it gathered.
 
   def emit(self, s):
     self.settings.outfile.write(s)
@@ -141,13 +143,14 @@ class PlainTextReporter(Reporter):
     return workunit.has_label(WorkUnit.REPL) or workunit.has_label(WorkUnit.RUN)
 
   def _format_aggregated_timings(self, aggregated_timings):
-    return '\n'.join(['%(timing).3f %(label)s' % x for x in aggregated_timings.get_all()])
+    return '\n'.join(['%.3f %s' % (x.timing, x.label) for x in aggregated_timings.snapshot()])
 
   def _format_artifact_cache_stats(self, artifact_cache_stats):
-    stats = artifact_cache_stats.get_all()
+    # We only need the counts, so we don't go through get_all(), which builds a dict per cache.
+    stats = artifact_cache_stats.stats_per_cache
     return 'No artifact cache reads.' if not stats else \
-    '\n'.join(['%(cache_name)s - Hits: %(num_hits)d Misses: %(num_misses)d' % x
-               for x in stats])
+    '\n'.join(['%s - Hits: %d Misses: %d' % (name, len(stat.hit_targets), len(stat.miss_targets))
+               for name, stat in stats.items()])
 
   def _indent(self, workunit):
     return '  ' * (len(workunit.ancestors()) - 1)
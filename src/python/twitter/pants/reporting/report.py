@@ -80,8 +80,7 @@ class Report(object):
       self._notify()  # Make sure we flush everything reported until now.
       for reporter in self._reporters.values():
         reporter.end_workunit(workunit)
-      if workunit.id in self._workunits:
-        del self._workunits[workunit.id]
+      self._workunits.pop(workunit.id, None)
 
   def flush(self):
     with self._lock:
@@ -104,3 +103,5 @@ class Report(object):
         if len(s) > 0:
           for reporter in self._reporters.values():
             reporter.handle_output(workunit, label, s)
+    for reporter in self._reporters.values():
+      reporter.flush()
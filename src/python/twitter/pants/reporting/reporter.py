@@ -62,6 +62,14 @@ class Reporter(object):
     """
     pass
 
+  def flush(self):
+    """Flush any buffered content.
+
+    Called periodically, so that reporters can write in large chunks rather than flushing
+    after every little bit of content, while still reporting in close to real time.
+    """
+    pass
+
   def is_under_main_root(self, workunit):
     """Is the workunit running under the main thread's root."""
     return self.run_tracker.is_under_main_root(workunit)
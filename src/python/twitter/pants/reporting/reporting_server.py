@@ -1,14 +1,16 @@
+import hashlib
 import itertools
 import json
 import mimetypes
 import os
 import pkgutil
-import pystache
 import re
+import shutil
 import urllib
 import urlparse
 
 import BaseHTTPServer
+import SocketServer
 
 from collections import namedtuple
 from datetime import date, datetime
@@ -99,9 +101,7 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                    'artifact_cache_stats_path': artifact_cache_stats_path})
       if run_id == 'latest':
         args['is_latest'] = run_info['id']
-      args.update({
-        'collapsible': lambda x: self._renderer.render_callable('collapsible', x, args)
-      })
+      args['collapsible'] = self._renderer.make_callable('collapsible', args)
     self._send_content(self._renderer.render_name('base', args), 'text/html')
 
   def _handle_browse(self, relpath, params):
@@ -134,7 +134,7 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
       prettify = True
       if self._settings.assets_dir:
         prettify_extra_dir = os.path.join(self._settings.assets_dir, 'js', 'prettify_extra_langs')
-        prettify_extra_langs = [ {'name': x} for x in os.listdir(prettify_extra_dir) ]
+        prettify_extra_langs = [ {'name': x} for x in self._list_dir_cached(prettify_extra_dir) ]
       else:
         # TODO: Find these from our package, somehow.
         prettify_extra_langs = []
@@ -143,16 +143,44 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
              'prettify': prettify, 'linenums': linenums }
     self._send_content(self._renderer.render_name('file_content', args), 'text/html')
 
+  # Dir path -> (mtime, names of entries in it). Shared by all requests.
+  _dir_listings = {}
+
+  # Asset path -> (content, etag), for the assets embedded in our package. Shared by all requests.
+  _embedded_assets = {}
+
+  def _list_dir_cached(self, abspath):
+    """Lists a dir that we expect to rarely change, listing it again only when it does."""
+    mtime = os.path.getmtime(abspath)
+    cached = PantsHandler._dir_listings.get(abspath)
+    if cached is None or cached[0] != mtime:
+      cached = (mtime, os.listdir(abspath))
+      PantsHandler._dir_listings[abspath] = cached
+    return cached[1]
+
   def _handle_assets(self, relpath, params):
     """Statically serve assets: js, css etc."""
+    # Every report page loads the same assets, so we tag each one, and browsers that already have
+    # it only get a 304 back.
+    content_type = mimetypes.guess_type(relpath)[0] or 'text/plain'
     if self._settings.assets_dir:
       abspath = os.path.normpath(os.path.join(self._settings.assets_dir, relpath))
-      with open(abspath, 'r') as infile:
-        content = infile.read()
+      with open(abspath, 'rb') as infile:
+        st = os.fstat(infile.fileno())
+        etag = '"%x-%x"' % (st.st_size, int(st.st_mtime * 1000))
+        if not self._send_not_modified(etag):
+          self._send_file(infile, content_type, etag=etag)
     else:
-      content = pkgutil.get_data(__name__, os.path.join('assets', relpath))
-    content_type = mimetypes.guess_type(relpath)[0] or 'text/plain'
-    self._send_content(content, content_type)
+      # The assets embedded in our package can't change, and there aren't many of them, so we
+      # only read each one once.
+      cached = PantsHandler._embedded_assets.get(relpath)
+      if cached is None:
+        content = pkgutil.get_data(__name__, os.path.join('assets', relpath))
+        cached = (content, '"%s"' % hashlib.md5(content).hexdigest())
+        PantsHandler._embedded_assets[relpath] = cached
+      content, etag = cached
+      if not self._send_not_modified(etag):
+        self._send_content(content, content_type, etag=etag)
 
   def _handle_poll(self, relpath, params):
     """Handle poll requests for raw file contents."""
@@ -259,14 +287,38 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                   'link_path': link_path })
     self._send_content(self._renderer.render_name('base', args), 'text/html')
 
-  def _send_content(self, content, content_type, code=200):
+  def _send_content(self, content, content_type, code=200, etag=None):
     """Send content to client."""
     self.send_response(code)
     self.send_header('Content-Type', content_type)
     self.send_header('Content-Length', str(len(content)))
+    if etag:
+      self.send_header('ETag', etag)
     self.end_headers()
     self.wfile.write(content)
 
+  def _send_file(self, infile, content_type, code=200, etag=None):
+    """Send the content of an open file to client, without reading it all into memory first."""
+    self.send_response(code)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(os.fstat(infile.fileno()).st_size))
+    if etag:
+      self.send_header('ETag', etag)
+    self.end_headers()
+    shutil.copyfileobj(infile, self.wfile, 64 * 1024)
+
+  def _send_not_modified(self, etag):
+    """Send a 304 if the client already has the content with this etag.
+
+    Returns whether we did, in which case there's nothing more to send.
+    """
+    if self.headers.get('If-None-Match') != etag:
+      return False
+    self.send_response(304)
+    self.send_header('ETag', etag)
+    self.end_headers()
+    return True
+
   def _client_allowed(self):
     """Check if client is allowed to connect to this server."""
     client_ip = self._client_address[0]
@@ -305,7 +357,7 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
   def _default_template_args(self, content_template):
     """Initialize template args."""
     def include(text, args):
-      template_name = pystache.render(text, args)
+      template_name = self._renderer.render(text, args)
       return self._renderer.render_name(template_name, args)
     # Our base template calls include on the content_template.
     ret = { 'content_template': content_template }
@@ -317,6 +369,16 @@ class PantsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
     pass
 
 
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """An HTTPServer that handles each request in its own thread.
+
+  A report page fetches many assets and polls several files at once, so we don't want those
+  requests to queue up behind each other.
+  """
+  # Don't let in-flight requests keep the process alive after we're done serving.
+  daemon_threads = True
+
+
 class ReportingServer(object):
   # Reporting server settings.
   #   info_dir: path to dir containing RunInfo files.
@@ -336,7 +398,7 @@ class ReportingServer(object):
       def __init__(self, request, client_address, server):
         PantsHandler.__init__(self, settings, renderer, request, client_address, server)
 
-    self._httpd = BaseHTTPServer.HTTPServer(('', port), MyHandler)
+    self._httpd = ThreadingHTTPServer(('', port), MyHandler)
     self._httpd.timeout = 0.1  # Not the network timeout, but how often handle_request yields.
 
   def server_port(self):
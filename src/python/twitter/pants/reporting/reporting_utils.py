@@ -20,7 +20,7 @@ def items_to_report_element(items, item_type):
     else:
       return x + 's'
 
-  items = [str(x) for x in items]
+  items = map(str, items)
   n = len(items)
   text = '%d %s' % (n, item_type if n == 1 else pluralize(item_type))
   if n == 0:
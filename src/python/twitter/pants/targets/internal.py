@@ -43,27 +43,45 @@ class InternalTarget(Target):
   def sort_targets(cls, internal_targets):
     """Returns the targets that internal_targets depend on sorted from most dependent to least."""
     roots = OrderedSet()
-    inverted_deps = collections.defaultdict(OrderedSet)  # target -> dependent targets
+    # target -> dependent targets. Each target's dependencies are only inverted on its first visit,
+    # so every edge is added exactly once and a list suffices.
+    inverted_deps = collections.defaultdict(list)
     visited = set()
     path = OrderedSet()
 
-    def invert(target):
+    # Both walks below use explicit stacks rather than recursion, so that deep dependency chains in
+    # large repos don't hit the interpreter's recursion limit.
+    def visit(target, stack):
       if target in path:
         path_list = list(path)
         cycle_head = path_list.index(target)
         cycle = path_list[cycle_head:] + [target]
         raise cls.CycleException(cycle)
-      path.add(target)
-      if target not in visited:
-        visited.add(target)
-        if getattr(target, 'internal_dependencies', None):
-          for internal_dependency in target.internal_dependencies:
-            if hasattr(internal_dependency, 'internal_dependencies'):
-              inverted_deps[internal_dependency].add(target)
-              invert(internal_dependency)
+      if target in visited:
+        return
+      visited.add(target)
+      # internal_dependencies is a property that may resolve pending deps, so only access it once.
+      internal_dependencies = getattr(target, 'internal_dependencies', None)
+      if internal_dependencies:
+        path.add(target)
+        stack.append((target, iter(internal_dependencies)))
+      else:
+        roots.add(target)
+
+    def invert(target):
+      # A depth-first walk of the dependency graph. path holds the targets on the stack.
+      stack = []
+      visit(target, stack)
+      while stack:
+        target, internal_dependencies = stack[-1]
+        for internal_dependency in internal_dependencies:
+          if hasattr(internal_dependency, 'internal_dependencies'):
+            inverted_deps[internal_dependency].append(target)
+            visit(internal_dependency, stack)
+            break
         else:
-          roots.add(target)
-      path.remove(target)
+          stack.pop()
+          path.remove(target)
 
     for internal_target in internal_targets:
       invert(internal_target)
@@ -71,16 +89,22 @@ class InternalTarget(Target):
     ordered = []
     visited.clear()
 
-    def topological_sort(target):
-      if target not in visited:
-        visited.add(target)
-        if target in inverted_deps:
-          for dep in inverted_deps[target]:
-            topological_sort(dep)
-        ordered.append(target)
-
+    # A post-order walk of the inverted graph.
     for root in roots:
-      topological_sort(root)
+      if root in visited:
+        continue
+      visited.add(root)
+      stack = [(root, iter(inverted_deps.get(root, ())))]
+      while stack:
+        target, dependents = stack[-1]
+        for dependent in dependents:
+          if dependent not in visited:
+            visited.add(dependent)
+            stack.append((dependent, iter(inverted_deps.get(dependent, ()))))
+            break
+        else:
+          stack.pop()
+          ordered.append(target)
 
     return ordered
 
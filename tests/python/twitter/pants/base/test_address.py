@@ -15,6 +15,7 @@
 # ==================================================================================================
 
 import os
+import pickle
 import pytest
 import unittest
 
@@ -78,3 +79,21 @@ class AddressTest(unittest.TestCase):
 
         with pytest.raises(IOError):
           Address.parse(root_dir, 'b/c', is_relative=False)
+
+  def test_equal_addresses_hash_equal(self):
+    with self.workspace('a/BUILD') as root_dir:
+      a = Address.parse(root_dir, 'a:b')
+      b = Address.parse(root_dir, 'a/BUILD:b')
+      self.assertEqual(a, b)
+      self.assertEqual(hash(a), hash(b))
+      self.assertEqual(1, len(set([a, b])))
+      self.assertNotEqual(hash(a), hash(Address.parse(root_dir, 'a:c')))
+
+  def test_pickle(self):
+    with self.workspace('a/BUILD') as root_dir:
+      a = Address.parse(root_dir, 'a:b')
+      for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        unpickled = pickle.loads(pickle.dumps(a, protocol))
+        self.assertEqual(a, unpickled)
+        self.assertEqual(hash(a), hash(unpickled))
+        self.assertAddress(root_dir, 'a/BUILD', 'b', unpickled)
@@ -0,0 +1,43 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import unittest
+
+from twitter.pants.base.mustache import MustacheRenderer
+
+
+class ParseCallableArgsTest(unittest.TestCase):
+  def parse(self, arg_string):
+    return MustacheRenderer._parse_callable_args(arg_string)
+
+  def test_simple(self):
+    self.assertEqual({}, self.parse(''))
+    self.assertEqual({'id': 'foo', 'title': 'bar'}, self.parse('id=foo&title=bar'))
+
+  def test_unquoting(self):
+    self.assertEqual({'title': 'a b&c', 'x y': '1'}, self.parse('title=a+b%26c&x%20y=1'))
+
+  def test_blank_values(self):
+    self.assertEqual({'id': 'foo'}, self.parse('id=foo&title=&initially_open&&'))
+
+  def test_first_value_wins(self):
+    self.assertEqual({'id': 'foo'}, self.parse('id=foo&id=bar'))
+
+  def test_semicolon_is_not_a_separator(self):
+    self.assertEqual({'title': 'a;b', 'id': 'foo'}, self.parse('title=a;b&id=foo'))
+
+  def test_value_may_contain_equals(self):
+    self.assertEqual({'cmd': 'a=b'}, self.parse('cmd=a=b'))
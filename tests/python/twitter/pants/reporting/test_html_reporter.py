@@ -0,0 +1,95 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import pkgutil
+import shutil
+import tempfile
+import unittest
+
+from collections import namedtuple
+
+from twitter.pants.base.build_root import BuildRoot
+from twitter.pants.reporting.html_reporter import HtmlReporter
+from twitter.pants.reporting.report import Report
+
+
+FakeWorkUnit = namedtuple('FakeWorkUnit', ['id'])
+
+class HtmlReporterTest(unittest.TestCase):
+  def setUp(self):
+    self._buildroot = tempfile.mkdtemp(prefix='test_html_reporter')
+    self._html_dir = os.path.join(self._buildroot, 'reports')
+    self._template_dir = os.path.join(self._buildroot, 'templates')
+    os.makedirs(self._html_dir)
+    os.makedirs(self._template_dir)
+    # Log messages are also rendered with the message template, so we use the embedded one.
+    self._write_template('message', pkgutil.get_data('twitter.pants.reporting',
+                                                     'templates/message.mustache'), 1000)
+
+  def tearDown(self):
+    if os.path.exists(self._buildroot):
+      shutil.rmtree(self._buildroot, ignore_errors=True)
+
+  def _write_template(self, name, content, mtime):
+    path = os.path.join(self._template_dir, name + '.mustache')
+    with open(path, 'w') as outfile:
+      outfile.write(content)
+    # Set the mtime explicitly, so the edit is visible even on filesystems with coarse mtimes.
+    os.utime(path, (mtime, mtime))
+
+  def _open_reporter(self, template_dir):
+    with BuildRoot().temporary(self._buildroot):
+      settings = HtmlReporter.Settings(log_level=Report.INFO, html_dir=self._html_dir,
+                                       template_dir=template_dir)
+      reporter = HtmlReporter(None, settings)
+    reporter.open()
+    return reporter
+
+  def test_append_to_workunit_template_edits_are_picked_up(self):
+    self._write_template('append_to_workunit', 'v1 {{workunit_id}}:{{{content}}}\n', 1000)
+    reporter = self._open_reporter(self._template_dir)
+    workunit = FakeWorkUnit(id='wu')
+    reporter.do_handle_log(workunit, Report.INFO, 'first')
+    self._write_template('append_to_workunit', 'v2 {{workunit_id}}:{{{content}}}\n', 2000)
+    reporter.do_handle_log(workunit, Report.INFO, 'second')
+    reporter.close()
+
+    with open(reporter.report_path(), 'r') as infile:
+      report = infile.read()
+    # The second message must be rendered with the edited template.
+    first, second = report.split('v2 wu:')
+    self.assertTrue(first.startswith('v1 wu:'))
+    self.assertTrue('first' in first)
+    self.assertFalse('second' in first)
+    self.assertTrue('second' in second)
+
+  def test_path_logged_before_it_exists_is_linked_once_it_does(self):
+    reporter = self._open_reporter(None)
+    workunit = FakeWorkUnit(id='wu')
+    relpath = 'foo/bar/later.txt'
+    link = '<a target="_blank" href="/browse/%s">%s</a>' % (relpath, relpath)
+    reporter.do_handle_log(workunit, Report.INFO, 'compiling %s' % relpath)
+    reporter.flush()
+    with open(reporter.report_path(), 'r') as infile:
+      self.assertFalse(link in infile.read())
+
+    os.makedirs(os.path.join(self._buildroot, 'foo/bar'))
+    open(os.path.join(self._buildroot, relpath), 'a').close()
+    reporter.do_handle_log(workunit, Report.INFO, 'compiling %s' % relpath)
+    reporter.close()
+    with open(reporter.report_path(), 'r') as infile:
+      self.assertTrue(link in infile.read())
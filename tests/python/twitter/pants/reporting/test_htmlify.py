@@ -0,0 +1,72 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from twitter.pants.reporting.htmlify import htmlify_text
+
+
+class HtmlifyTest(unittest.TestCase):
+  def setUp(self):
+    self._buildroot = tempfile.mkdtemp(prefix='test_htmlify')
+
+  def tearDown(self):
+    if os.path.exists(self._buildroot):
+      shutil.rmtree(self._buildroot, ignore_errors=True)
+
+  def test_htmlify_ansi_color_codes(self):
+    self.assertEqual('<span>foo</span>', htmlify_text(self._buildroot, 'foo'))
+    self.assertEqual('<span>foo</span><span class="ansi-31">bar</span><span class="ansi-0"></span>',
+                     htmlify_text(self._buildroot, 'foo\033[31mbar\033[0m'))
+    self.assertEqual('<span></span><span class="ansi-1 ansi-32">baz</span>',
+                     htmlify_text(self._buildroot, '\033[1;32mbaz'))
+
+  def test_htmlify_text(self):
+    self.assertEqual('<span>a &lt;b&gt; &amp; c</br>d</span>',
+                     htmlify_text(self._buildroot, 'a <b> & c\nd'))
+    self.assertEqual('<span>see <a target="_blank" href="http://foo.com/bar/baz">'
+                     'http://foo.com/bar/baz</a></span>',
+                     htmlify_text(self._buildroot, 'see http://foo.com/bar/baz'))
+
+  def test_htmlify_multiline_paths(self):
+    self.assertEqual('<span><a target="_blank" href="http://foo.com/bar">http://foo.com/bar</a>'
+                     '</br><a target="_blank" href="http://foo.com/baz">http://foo.com/baz</a>'
+                     '</span>',
+                     htmlify_text(self._buildroot, 'http://foo.com/bar\nhttp://foo.com/baz'))
+
+  def test_htmlify_colored_paths(self):
+    self.assertEqual('<span></span><span class="ansi-31">'
+                     '<a target="_blank" href="http://foo.com/bar">http://foo.com/bar</a></span>'
+                     '<span class="ansi-0"></span>',
+                     htmlify_text(self._buildroot, '\033[31mhttp://foo.com/bar\033[0m'))
+
+  def test_htmlify_ansi_color_codes_and_paths(self):
+    self.assertEqual('<span></span><span class="ansi-31">see <a target="_blank" '
+                     'href="http://foo.com/bar/baz">http://foo.com/bar/baz</a></span>'
+                     '<span class="ansi-0"></span>',
+                     htmlify_text(self._buildroot, '\033[31msee http://foo.com/bar/baz\033[0m'))
+
+  def test_htmlify_path_created_after_first_seen(self):
+    relpath = 'foo/bar/later.txt'
+    text = 'compiling %s' % relpath
+    self.assertEqual('<span>%s</span>' % text, htmlify_text(self._buildroot, text))
+    os.makedirs(os.path.join(self._buildroot, 'foo/bar'))
+    open(os.path.join(self._buildroot, relpath), 'a').close()
+    self.assertEqual('<span>compiling <a target="_blank" href="/browse/%s">%s</a></span>'
+                     % (relpath, relpath), htmlify_text(self._buildroot, text))
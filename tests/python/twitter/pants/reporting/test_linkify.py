@@ -52,3 +52,19 @@ class RunInfoTest(unittest.TestCase):
     self._do_test_linkify('/browse/foo/bar/BUILD', 'foo/bar')
     self._do_test_linkify('/browse/foo/bar/BUILD', 'foo/bar:target')
 
+  def test_linkify_ignores_trailing_dots(self):
+    relpath = 'foo/bar.txt'
+    ensure_file_exists(os.path.join(self._buildroot, relpath))
+    self.assertEqual('compiling <a target="_blank" href="/browse/%s">%s</a>...'
+                     % (relpath, relpath),
+                     linkify(self._buildroot, 'compiling %s...' % relpath))
+
+  def test_no_linkify_nonexistent(self):
+    for s in ('foo/bar/baz', '/foo/bar/baz', 'foo/bar:baz', 'a.b-c/d. e', '1/2 and 3'):
+      self.assertEqual(s, linkify(self._buildroot, s))
+
+  def test_linkify_path_created_after_first_seen(self):
+    relpath = 'foo/bar/later.txt'
+    self.assertEqual(relpath, linkify(self._buildroot, relpath))
+    ensure_file_exists(os.path.join(self._buildroot, relpath))
+    self._do_test_linkify('/browse/%s' % relpath, relpath)
@@ -72,3 +72,25 @@ class InternalTargetTest(BaseMockTargetTest):
     self.assertEquals(InternalTarget.sort_targets([a,b,c,d,e]), [e,d,c,b,a])
     self.assertEquals(InternalTarget.sort_targets([b,d,a,e,c]), [e,d,c,b,a])
     self.assertEquals(InternalTarget.sort_targets([e,d,c,b,a]), [e,d,c,b,a])
+
+  def testSortDiamond(self):
+    a = MockTarget('a', [])
+    b = MockTarget('b', [a])
+    c = MockTarget('c', [a])
+    d = MockTarget('d', [b, c])
+
+    ordered = InternalTarget.sort_targets([d])
+    self.assertEquals(4, len(ordered))
+    self.assertEquals(d, ordered[0])
+    self.assertEquals(a, ordered[-1])
+    self.assertEquals(set([b, c]), set(ordered[1:3]))
+
+  def testSortDeepChain(self):
+    # Deeper than the default recursion limit would allow.
+    targets = [MockTarget('t0', [])]
+    for i in range(1, 1500):
+      targets.append(MockTarget('t%d' % i, [targets[-1]]))
+
+    # Only pass the head, so that the whole chain is walked from it.
+    self.assertEquals(list(reversed(targets)), InternalTarget.sort_targets([targets[-1]]))
+    self.assertEquals(list(reversed(targets)), InternalTarget.sort_targets(list(reversed(targets))))